@@ -0,0 +1 @@
+from .wrangler._backend import set_backend, get_backend
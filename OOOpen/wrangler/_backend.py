@@ -0,0 +1,28 @@
+_BACKENDS = ("pandas", "polars")
+_backend = "pandas"
+
+def set_backend(name: str):
+    """Choose the DataFrame library used by rsi, pivot_points, get_supports and
+    get_resistances
+
+    Parameters
+    ----------
+    name : str
+        "pandas" (the default) or "polars". With "polars" those functions take
+        and return polars DataFrames and pandas is kept out of their hot path
+
+    Raises
+    ------
+    ValueError
+        If name is not a known backend
+    """
+    global _backend
+    if name not in _BACKENDS:
+        raise ValueError("Unknown backend {}, use one of {}".format(name, _BACKENDS))
+    if name == "polars":
+        import polars
+    _backend = name
+
+def get_backend() -> str:
+    """Return the name of the DataFrame library in use (see set_backend)"""
+    return _backend
@@ -0,0 +1,121 @@
+"""Array kernels behind the supports and resistances scans
+
+They work over plain numpy arrays sorted by date, never over DataFrames, and are
+compiled with numba when it is installed. Both get_supports backends (pandas and
+polars) are thin adapters over them
+"""
+from numpy import subtract, abs, divide, negative, less, logical_and, zeros, empty, \
+    searchsorted, flatnonzero, int64, bool_, full, count_nonzero
+from ._njit import njit, prange, HAS_NUMBA
+try:
+    from numexpr import evaluate
+except ImportError:
+    evaluate = None
+
+@njit(cache=True, nogil=True, parallel=True)
+def _supports_kernel(ref_vec, compare_vec, sup_dates, data_dates, is_sup, thresh, resistances):
+    """For each support walk forward over the later days until it gets broken
+
+    Returns three arrays with the days each support survived, the number of
+    supports days that got close to breaking it and the position in compare_vec
+    of the day that broke it (len(compare_vec) if it never broke)
+    """
+    sign = -1.0 if resistances else 1.0
+    n, m = ref_vec.shape[0], compare_vec.shape[0]
+    starts = searchsorted(data_dates, sup_dates, side="right")
+    age = zeros(n, dtype=int64)
+    near = zeros(n, dtype=int64)
+    end_idx = empty(n, dtype=int64)
+    for i in prange(n):
+        ref = ref_vec[i]
+        j = starts[i]
+        count = 0
+        while j < m:
+            dif = sign*(ref - compare_vec[j])/abs(ref)
+            if not dif < thresh:
+                break
+            if is_sup[j] and abs(dif) < thresh:
+                count += 1
+            j += 1
+        age[i] = j - starts[i]
+        near[i] = count
+        end_idx[i] = j
+    return age, near, end_idx
+
+def _supports_numpy(ref_vec, compare_vec, sup_dates, data_dates, is_sup, thresh, resistances):
+    """Same as _supports_kernel for when numba is not installed. Each support
+    checks windows of days of growing size with numpy, so it can still stop soon
+    after the day that breaks it
+    """
+    m = compare_vec.shape[0]
+    starts = searchsorted(data_dates, sup_dates, side="right")
+    near = zeros(ref_vec.shape[0], dtype=int64)
+    end_idx = full(ref_vec.shape[0], m, dtype=int64)
+    for i, (ref, j) in enumerate(zip(ref_vec, starts)):
+        width = 64
+        while j < m:
+            #Resistances flip the difference in place, supports skip the sign
+            dif = subtract(ref, compare_vec[j:j + width])
+            if resistances:
+                negative(dif, out=dif)
+            divide(dif, abs(ref), out=dif)
+            broken = ~(dif < thresh)
+            k = broken.argmax() if broken.any() else dif.shape[0]
+            near[i] += count_nonzero(is_sup[j:j + k] & (abs(dif[:k]) < thresh))
+            if k < dif.shape[0]:
+                end_idx[i] = j + k
+                break
+            j += width
+            width *= 2
+    return end_idx - starts, near, end_idx
+
+_scan_supports = _supports_kernel if HAS_NUMBA else _supports_numpy
+
+@njit(cache=True, nogil=True, parallel=True)
+def _expand_ranges(starts, ends, m):
+    """Build a boolean matrix with m columns where row i is only True in
+    [starts[i], ends[i])
+    """
+    out = zeros((starts.shape[0], m), dtype=bool_)
+    for i in prange(starts.shape[0]):
+        out[i, starts[i]:ends[i]] = True
+    return out
+
+
+@njit(cache=True, nogil=True, parallel=True)
+def _close_in_ranges(ref_vec, compare_vec, starts, ends, thresh):
+    """Build a boolean matrix with a column per day in compare_vec where row i is
+    True for the days in [starts[i], ends[i]) closer than thresh to ref_vec[i],
+    the days outside the range are not even compared
+    """
+    out = zeros((ref_vec.shape[0], compare_vec.shape[0]), dtype=bool_)
+    for i in prange(ref_vec.shape[0]):
+        ref = ref_vec[i]
+        out[i, starts[i]:ends[i]] = abs(ref - compare_vec[starts[i]:ends[i]])/ref < thresh
+    return out
+
+
+def _close_supports(ref_vec, comp_vec, sup_pos, age, near, end_idx, thresh):
+    """Boolean matrix where [i, k] says if support k was a close day for support i,
+    sup_pos are the positions of the supports in comp_vec. Only the supports with
+    any close day need to be compared against the rest
+    """
+    days_close = zeros((len(ref_vec), len(sup_pos)), dtype=bool)
+    rows = flatnonzero(near)
+    if rows.size and evaluate is not None:
+        #numexpr streams the whole expression without float temporaries
+        ref, comp, pos = ref_vec[rows, None], comp_vec[None, sup_pos], sup_pos[None, :]
+        start, end = (end_idx - age)[rows, None], end_idx[rows, None]
+        days_close[rows] = evaluate(
+            "(abs(ref - comp)/abs(ref) < thresh) & (pos >= start) & (pos < end)")
+    elif rows.size:
+        ref = ref_vec[rows, None]
+        difs = subtract.outer(ref_vec[rows], comp_vec[sup_pos])
+        abs(difs, out=difs)
+        divide(difs, abs(ref), out=difs)
+        close = less(difs, thresh)
+        del difs
+        logical_and(close, sup_pos >= (end_idx - age)[rows, None], out=close)
+        logical_and(close, sup_pos < end_idx[rows, None], out=close)
+        days_close[rows] = close
+    return days_close
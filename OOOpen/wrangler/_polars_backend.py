@@ -0,0 +1,45 @@
+import polars as pl
+from numpy import flatnonzero
+from .oscilators import _rsi
+from ._kernels import _scan_supports, _close_supports
+
+def rsi(data: pl.DataFrame, nd: int = 14) -> pl.DataFrame:
+    """Polars version of oscilators.rsi"""
+    out = _rsi(data["open"].cast(pl.Float64).to_numpy(),
+        data["close"].cast(pl.Float64).to_numpy(), nd)
+    return data.with_columns(pl.Series("rsi{}".format(nd), out))
+
+def pivot_points(data: pl.DataFrame) -> pl.DataFrame:
+    """Polars version of pivot_points.pivot_points"""
+    high, low = pl.col("high").shift(1), pl.col("low").shift(1)
+    #Missing prices count as zero, like the nansum of the pandas version
+    pivots = pl.sum_horizontal(pl.col("close").shift(1).fill_nan(None),
+        high.fill_nan(None), low.fill_nan(None))/3
+    r1 = 2*pivots - low
+    s1 = 2*pivots - high
+    return data.with_columns(pivots = pivots, r1 = r1, r2 = pivots + (r1 - s1),
+        s1 = s1, s2 = pivots - (r1 - s1))
+
+def get_supports(data: pl.DataFrame, reference_col: str = "low", compare_col: str = "close",
+                date_col: str = "date", thresh: float = 0.01, resistances: bool = False) -> tuple:
+    """Polars version of supports.get_supports, the close days are returned as a
+    boolean numpy matrix aligned with the rows of the supports DataFrame
+    """
+    data = data.sort(date_col)
+    value = pl.col(reference_col)
+    if resistances:
+        mask = (value > value.shift(1)) & (value > value.shift(-1))
+    else:
+        mask = (value < value.shift(1)) & (value < value.shift(-1))
+    is_sup = data.select(mask.fill_null(False)).to_series().to_numpy()
+    sups = data.filter(is_sup)
+    ref_vec = sups[reference_col].cast(pl.Float64).to_numpy()
+    comp_vec = data[compare_col].cast(pl.Float64).to_numpy()
+    age, near, end_idx = _scan_supports(ref_vec, comp_vec,
+        sups[date_col].to_physical().to_numpy(), data[date_col].to_physical().to_numpy(),
+        is_sup, thresh, resistances)
+    days_close = _close_supports(ref_vec, comp_vec, flatnonzero(is_sup), age, near,
+        end_idx, thresh)
+    ret = sups.with_columns(age = pl.Series(age), near = pl.Series(near)) \
+        .with_columns(end = pl.col(date_col) + pl.duration(days = pl.col("age")))
+    return ret, days_close
@@ -1,3 +1,71 @@
+from numpy import empty, nan, errstate
+from pandas import Series
+from ._njit import njit, HAS_NUMBA
+from ._backend import get_backend
+try:
+    from numexpr import evaluate
+except ImportError:
+    evaluate = None
+
+@njit(cache=True, nogil=True)
+def _rsi_loop(open_arr, close_arr, nd, out):
+    """Fill out with the rsi of the last nd days keeping running sums of the
+    gains and losses, days outside the window are subtracted as it moves
+    """
+    w = l = 0.0
+    nw = nl = nnan = 0
+    for i in range(open_arr.shape[0]):
+        dif = open_arr[i] - close_arr[i]
+        if dif != dif:
+            nnan += 1
+        elif dif > 0:
+            w += dif
+            nw += 1
+        elif dif < 0:
+            l -= dif
+            nl += 1
+        if i >= nd:
+            dif = open_arr[i - nd] - close_arr[i - nd]
+            if dif != dif:
+                nnan -= 1
+            elif dif > 0:
+                w -= dif
+                nw -= 1
+            elif dif < 0:
+                l += dif
+                nl -= 1
+        #Reset empty sums so rounding residuals don't turn into fake gains/losses
+        if nw == 0:
+            w = 0.0
+        if nl == 0:
+            l = 0.0
+        if i < nd - 1 or nnan > 0:
+            out[i] = nan
+        elif l > 0:
+            out[i] = 100 - 100/(1 + w/l)
+        elif w > 0:
+            out[i] = 100.0
+        else:
+            out[i] = nan
+
+
+def _rsi(open_arr, close_arr, nd: int):
+    """Return the rsi of the given prices, with the numba loop if available and
+    otherwise with pandas rolling sums and numexpr for the final ratio
+    """
+    if HAS_NUMBA:
+        out = empty(open_arr.shape[0])
+        _rsi_loop(open_arr, close_arr, nd, out)
+        return out
+    dif = Series(open_arr - close_arr)
+    w = dif.clip(lower=0).rolling(nd).sum().to_numpy()
+    l = -dif.clip(upper=0).rolling(nd).sum().to_numpy()
+    if evaluate is not None:
+        return evaluate("100 - 100/(1 + w/l)")
+    with errstate(divide="ignore", invalid="ignore"):
+        return 100 - 100/(1 + w/l)
+
+
 def rsi(data, nd: int = 14):
     """Add a new column to data with the rsi oscilator
 
@@ -14,7 +82,8 @@ def rsi(data, nd: int = 14):
     pandas.DataFrame
         The original DataFrame (data) with the new rsi column
     """
-    dif = data["open"] - data["close"]
-    w = dif.clip(lower=0).rolling(nd).sum()
-    l = -dif.clip(upper=0).rolling(nd).sum()
-    return data.assign(**{"rsi{}".format(nd): 100 - 100/(1 + w/l)})
\ No newline at end of file
+    if get_backend() == "polars":
+        from . import _polars_backend
+        return _polars_backend.rsi(data, nd)
+    out = _rsi(data["open"].to_numpy("float64"), data["close"].to_numpy("float64"), nd)
+    return data.assign(**{"rsi{}".format(nd): out})
@@ -1,4 +1,6 @@
 from pandas import DataFrame
+from numpy import nansum
+from ._backend import get_backend
 
 def pivot_points(data: DataFrame) -> DataFrame:
     """For each day in data calculate the pivot points and their associated
@@ -20,10 +22,14 @@ def pivot_points(data: DataFrame) -> DataFrame:
             s1: first support
             s2: second support
     """
-    yesterday = data[["close", "high", "low"]].shift(1)
-    pivots = yesterday.sum(axis=1)/3
-    r1 = 2*pivots - yesterday["low"]
-    s1 = 2*pivots - yesterday["high"]
+    if get_backend() == "polars":
+        from . import _polars_backend
+        return _polars_backend.pivot_points(data)
+    yesterday = data[["close", "high", "low"]].shift(1).to_numpy("float64")
+    high, low = yesterday[:, 1], yesterday[:, 2]
+    pivots = nansum(yesterday, axis=1)/3
+    r1 = 2*pivots - low
+    s1 = 2*pivots - high
     r2 = pivots + (r1 - s1)
     s2 = pivots - (r1 - s1)
     return data.assign(pivots = pivots, r1 = r1, r2 = r2, s1 = s1, s2 = s2)
\ No newline at end of file
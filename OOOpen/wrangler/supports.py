@@ -1,17 +1,32 @@
-from numpy.lib.type_check import real_if_close
-from pandas import DataFrame, Series, to_timedelta, read_pickle
-from numpy import subtract, logical_and, logical_or, invert, abs
+"""Supports and resistances of stock data
+
+Every matrix in this module is laid out as (supports, days): one row per
+support/resistance and one column per day of the data, C-contiguous, so that
+all the scans and reductions run along axis 1 over contiguous memory. Keep that
+orientation when adding new code instead of transposing matrices around.
+"""
+from pandas import DataFrame, Series, to_timedelta, read_pickle, factorize
+from numpy import abs, logical_and, zeros, flatnonzero, lexsort, diff, isin, \
+    concatenate, isnan, inf, where, maximum, array, broadcast_to, ascontiguousarray, \
+    unique, full, int64
 from pandas.core.reshape.concat import concat
 from .utils import id_to_date
+from ._njit import njit
+from ._kernels import _scan_supports, _expand_ranges, _close_in_ranges, _close_supports
+from ._backend import get_backend
 import pathlib
+from functools import lru_cache
 
-def _get_sup_func(x):
-    return x.iloc[0] > x.iloc[1] < x.iloc[2]
+@njit(cache=True)
+def _is_sup_window(x):
+    return x[0] > x[1] and x[1] < x[2]
 
-def _get_res_func(x):
-    return x.iloc[0] < x.iloc[1] > x.iloc[2]
+@njit(cache=True)
+def _is_res_window(x):
+    return x[0] < x[1] and x[1] > x[2]
 
-def _get_days(x: DataFrame, value_col: str, resistances: bool = False) -> DataFrame:
+def _get_days(x: DataFrame, value_col: str, resistances: bool = False,
+    engine: str = None) -> DataFrame:
     """Filter stock data leaving only days that were supports (or resistances)
 
     Parameters
@@ -22,64 +37,130 @@ def _get_days(x: DataFrame, value_col: str, resistances: bool = False) -> DataFr
         column to use as price for calculations
     resistances : bool, optional
         If true filter resistances instead or supports, by default False
+    engine : str, optional
+        If None (default) compare each day with its neighbours using vectorized
+        numpy comparisons, which is the fastest option. "cython" or "numba" run
+        the comparison per window through pandas rolling(...).apply with that
+        engine instead, "numba" compiles the comparator the first time it is used
 
     Returns
     -------
     DataFrame
         The filtered data
     """
-    func = _get_res_func if resistances else _get_sup_func
-    mins = x[value_col] \
-        .rolling(3, center=True) \
-        .agg(func) \
-        .fillna(0) \
-        .astype(bool)
-    return x[mins]
-
-def _get_compatible_dates(x1: DataFrame, x2: DataFrame, date_col: str = "date") -> DataFrame:
-    """Return a boolean DataFrame with compatible days, in ceil (x, y) True means
-    that day y is later than day x
+    return x[_days_mask(x, value_col, resistances, engine)]
+
+def _days_mask(x: DataFrame, value_col: str, resistances: bool = False,
+    engine: str = None):
+    """Boolean array with the rows of x that _get_days keeps"""
+    if engine is not None:
+        func = _is_res_window if resistances else _is_sup_window
+        return x[value_col] \
+            .rolling(3, center=True) \
+            .apply(func, raw=True, engine=engine) \
+            .fillna(0) \
+            .to_numpy(bool)
+    v = x[value_col].to_numpy()
+    mid = v[1:-1]
+    if resistances:
+        mask = (mid > v[:-2]) & (mid > v[2:])
+    else:
+        mask = (mid < v[:-2]) & (mid < v[2:])
+    keep = zeros(len(v), dtype=bool)
+    keep[1:-1] = mask
+    return keep
+
+def _date_values(x: DataFrame, date_col: str):
+    """Return the dates of x as a datetime64 numpy array, timezone aware dates are
+    expressed as their UTC instant (to_numpy would give an object array for them)
+    """
+    dates = x[date_col]
+    if getattr(dates.dtype, "tz", None) is not None:
+        dates = dates.dt.tz_convert(None)
+    return dates.to_numpy()
+
+def _int_dates(x: DataFrame, date_col: str, dtype = None):
+    """Return the dates of x as int64 reinterpreting the datetime64 values in place
+    instead of converting them. They are only converted when they are not already
+    in dtype (another numpy datetime64 dtype to express them in)
+    """
+    values = _date_values(x, date_col)
+    if dtype is not None and values.dtype != dtype:
+        values = values.astype(dtype)
+    return values.view("int64")
+
+def _prices(x: DataFrame, col: str):
+    """Return a column of x as a contiguous float64 array"""
+    return ascontiguousarray(x[col].to_numpy("float64"))
+
+def _survival_ranges(ref_vec, sup_dates, comp_vec, data_dates, thresh: float,
+    resistances: bool) -> tuple:
+    """Return the positions in comp_vec of the first day each support was alive and
+    of the day that broke it (len(comp_vec) if it never broke). The days must be
+    sorted by date, each support is alive from the day after it until the first
+    day that breaks it
+    """
+    age, _, end_idx = _scan_supports(ref_vec, comp_vec, sup_dates, data_dates,
+        zeros(len(comp_vec), dtype=bool), thresh, resistances)
+    return end_idx - age, end_idx
+
+def _breakers(sups: DataFrame, data: DataFrame, ends) -> Series:
+    ended = ends < len(data)
+    return Series(data.index[ends[ended]], index = sups.index[ended])
+
+def surviving_days (sups: DataFrame, data: DataFrame, thresh: float = 0.01,
+    date_col: str = "date", ref_col: str = "low", compare_col: str = "close",
+    resistances = False) -> tuple:
+    """Find the days each support/resistance survived and the day that broke it
 
     Parameters
     ----------
-    x1 : DataFrame
-        The data for the days to use as rows (x days in the above example)
-    x2 : DataFrame
-        The data for the days to use as colums (y days in the above example)
-    date_col : str
-        The column with the dates in each DataFrame
+    sups : DataFrame
+        The supports/resistances you want to check
+    data : DataFrame
+        The days to compare the supports/resistances with, in any order (they are
+        walked by date)
+    thresh : float, optional
+        Relative distance under the support/resistance price that a day can close
+        without breaking it, by default 0.01
+    date_col : str, optional
+        Column to use for date info, by default "date"
+    ref_col : str, optional
+        Column to use as values for the supports/resistances, by default "low"
+    compare_col : str, optional
+        column to use as values for the days in data, by default "close"
+    resistances : bool, optional
+        Wheter you are working with supports(false) or resistances(true), by default False
 
     Returns
     -------
-    DataFrame
-        A boolean DataFrame with index = x1.index and columns = x2.index
+    tuple
+        A boolean DataFrame with the supports/resistances as index and the days of
+        data as columns (in data's order) that says which days each one was alive,
+        and a Series with the id of the day that broke each support/resistance (only
+        for those that were broken)
     """
-    dates1, dates2 = x1[date_col].to_numpy("int"), x2[date_col].to_numpy("int")
-    difdates = subtract.outer(dates1, dates2)
-    return DataFrame(difdates < 0, index = x1.index, columns= x2.index)
-
-def surviving_days (sups: DataFrame, data: DataFrame, thresh: float = 0.01,
-    date_col: str = "date", ref_col: str = "low", compare_col: str = "close",
-    resistances = False) -> tuple:
-    compa = _get_compatible_dates(sups, data, date_col = date_col)
-    ref_val = sups[ref_col].to_numpy()
-    comp_val = data[compare_col].to_numpy()
-    difval = subtract.outer(ref_val, comp_val)
-    nordifval = difval / ref_val[:, None]
-    booldif = ((-1)**resistances)*nordifval < thresh
-    alive = logical_and(compa, booldif)
-    alive = logical_or(invert(compa), alive).cumprod(axis = 1).astype(bool)
-    alive = logical_and(compa, alive)
-    breakers = logical_and(invert(alive), compa)
-    breakers = breakers[breakers.any(axis = 1)].idxmax(axis = 1)
-    return alive, breakers
+    #The scan walks the days by date, sort them and put the columns back at the end
+    days = data if data[date_col].is_monotonic_increasing \
+        else data.sort_values(date_col, kind = "stable")
+    #sups and data can come from different sources, put both dates in data's unit
+    starts, ends = _survival_ranges(_prices(sups, ref_col),
+        _int_dates(sups, date_col, _date_values(days, date_col).dtype),
+        _prices(days, compare_col),
+        _int_dates(days, date_col), thresh, resistances)
+    alive = DataFrame(_expand_ranges(starts, ends, len(days)), index = sups.index,
+        columns = days.index)
+    if days is not data:
+        alive = alive[data.index]
+    return alive, _breakers(sups, days, ends)
 
 
 def close_days(data: DataFrame, compare: DataFrame, surviving_days: DataFrame, thresh: float = 0.01,
     reference_col: str = "low", compare_col: str = "close", date_col: str = "date",
     resistances: bool = False) -> DataFrame:
     """Return a matrix with which days that were close to be breached but finally
-    survived
+    survived. Kept as a public helper, get_supports_resistances computes the close
+    days directly from the survival ranges with the same kernel
 
     Parameters
     ----------
@@ -117,14 +198,43 @@ def close_days(data: DataFrame, compare: DataFrame, surviving_days: DataFrame, t
     """
     if not data.index.equals(surviving_days.index):
         raise ValueError("surviving_days index doesn't match data.index")
-    pbreachers = _get_days(compare, compare_col, resistances)[[date_col, compare_col]]
-    dates = _get_compatible_dates(data, pbreachers, date_col = date_col)
-    ref_val = data[reference_col].to_numpy()
-    comp_val = compare[compare_col].to_numpy()
-    valdif = abs(subtract.outer(ref_val, comp_val))
-    valdif = valdif/ref_val[:, None]
-    valdif = DataFrame(valdif, index=data.index, columns=compare.index)
-    return surviving_days[compare.index] & (valdif < thresh)
+    ref_val = _prices(data, reference_col)
+    comp_val = _prices(compare, compare_col)
+    alive = surviving_days.to_numpy()
+    if not surviving_days.columns.equals(compare.index):
+        alive = alive[:, surviving_days.columns.get_indexer(compare.index)]
+    #Same closeness test as get_supports_resistances over every day, then masked
+    close = _close_in_ranges(ref_val, comp_val, zeros(len(ref_val), dtype=int64),
+        full(len(ref_val), len(comp_val), dtype=int64), thresh)
+    logical_and(close, alive, out=close)
+    return DataFrame(close, index=data.index, columns=compare.index)
+
+
+def _weakest_broken(info: DataFrame, breakers: Series, value_col: str, exclude,
+    highest: bool = False) -> tuple:
+    """For each day that broke any of the supports in info pick the lowest support
+    it broke (highest resistance if highest)
+
+    Returns two arrays, the ids of the breaking days (sorted and without those in
+    exclude) and the ids of the support each of them broke
+    """
+    codes, break_ids = factorize(breakers.to_numpy(), sort = True)
+    values = info[value_col].to_numpy()[info.index.get_indexer(breakers.index)]
+    #Sort by breaker and then by value, the first row of each breaker is its weakest
+    order = lexsort((-values if highest else values, codes))
+    firsts = order[flatnonzero(diff(codes[order], prepend = -1))]
+    keep = ~isin(break_ids, exclude)
+    return break_ids[keep], breakers.index.to_numpy()[firsts][keep]
+
+
+def _days_frame(index, starts, ends, columns) -> DataFrame:
+    """Surviving days matrix for the given alive ranges with the rows sorted by
+    index, the ranges are sorted before expanding them so the big matrix is
+    built only once
+    """
+    perm = index.argsort(kind = "stable")
+    return DataFrame(_expand_ranges(starts[perm], ends[perm], len(columns)),
+        index = index[perm], columns = columns)
 
 
 def get_supports_resistances(data, thresh: int = 0.01, date_col: str = "date") -> DataFrame:
@@ -159,76 +269,75 @@ def get_supports_resistances(data, thresh: int = 0.01, date_col: str = "date") -
     res = _get_days(data, value_col= "high", resistances= True)[["symbol", "date", "high", "volume"]]
     #Calculate the days the support and resistances survived and the id of the day
     # that finally breached them
-    sdays, sbreakers = surviving_days(sup, data, thresh, date_col)
-    rdays, rbreakers = surviving_days(res, data, thresh, date_col, "high", resistances= True)
+    #The prices and dates of data are extracted once and shared by every scan
+    close, dates = _prices(data, "close"), _int_dates(data, date_col)
+    sstarts, sends = _survival_ranges(_prices(sup, "low"), _int_dates(sup, date_col),
+        close, dates, thresh, False)
+    rstarts, rends = _survival_ranges(_prices(res, "high"), _int_dates(res, date_col),
+        close, dates, thresh, True)
+    sbreakers, rbreakers = _breakers(sup, data, sends), _breakers(res, data, rends)
     #Enrich the supports/resistances with the above information
-    sup = sup.assign(age = sdays.sum(axis = 1), enday = id_to_date(sbreakers),
+    sup = sup.assign(age = sends - sstarts, enday = id_to_date(sbreakers),
         ended = sbreakers.notna(), original = True)
-    res = res.assign(age = rdays.sum(axis = 1), enday = id_to_date(rbreakers),
+    res = res.assign(age = rends - rstarts, enday = id_to_date(rbreakers),
         ended = rbreakers.notna(), original = True)
     #Days that broke a resistance become support and vice versa
-    #Select the days that break any support or ressintance
-    auxsbreakers, auxrbreakers = sbreakers.dropna(), rbreakers.dropna()
     #A day can break multiple supports or resistances in that case we focus only in
     # the lowest support (or higher resistance)
     #Some breakers can be already supports or resistances themselves, in that case
     # we ignore them
-    auxsbreakers = sup \
-        .assign(breakers = sbreakers) \
-        .groupby("breakers")["low"] \
-        .agg("idxmin") \
-        .drop(res.index, errors = "ignore")
-    #The days that break support will become resistances, we drop those days that
-    # are already resistances
-    auxrbreakers = res \
-        .assign(breakers = rbreakers) \
-        .groupby("breakers")["high"] \
-        .agg("idxmax") \
-        .drop(sup.index, errors = "ignore") #Drop days that are already supports
-    #Get the data for those breakers
-    second_resistances = data.loc[auxsbreakers.index, ["symbol", "date", "volume"]]
-    auxsbreakers = Series(auxsbreakers.index, index = auxsbreakers.values)
-    second_resistances = second_resistances \
-        .assign(high = sup.loc[auxsbreakers.index, "low"].rename(index = auxsbreakers))
-    second_supports = data.loc[auxrbreakers.index, ["symbol", "date", "volume"]]
-    auxrbreakers = Series(auxrbreakers.index, index = auxrbreakers.values)
-    second_supports = second_supports \
-        .assign(low = res.loc[auxrbreakers.index, "high"].rename(index = auxrbreakers))
-    del(auxsbreakers, auxrbreakers)
+    sbreak_ids, sbroken = _weakest_broken(sup, sbreakers, "low", res.index)
+    rbreak_ids, rbroken = _weakest_broken(res, rbreakers, "high", sup.index, highest = True)
+    #Get the data for those breakers, the days that break support will become resistances
+    # at the price of the support they broke and vice versa
+    second_resistances = data.loc[sbreak_ids, ["symbol", "date", "volume"]] \
+        .assign(high = sup.loc[sbroken, "low"].to_numpy())
+    second_supports = data.loc[rbreak_ids, ["symbol", "date", "volume"]] \
+        .assign(low = res.loc[rbroken, "high"].to_numpy())
     #Enrich those breakers
-    sdays2, sbreakers2 = surviving_days(second_supports, data, thresh, date_col)
-    rdays2, rbreakers2 = surviving_days(second_resistances, data, thresh, date_col, "high", resistances=True)
+    sstarts2, sends2 = _survival_ranges(_prices(second_supports, "low"),
+        _int_dates(second_supports, date_col), close, dates, thresh, False)
+    rstarts2, rends2 = _survival_ranges(_prices(second_resistances, "high"),
+        _int_dates(second_resistances, date_col), close, dates, thresh, True)
+    sbreakers2, rbreakers2 = _breakers(second_supports, data, sends2), \
+        _breakers(second_resistances, data, rends2)
     second_supports = second_supports \
-        .assign(age = sdays2.sum(axis = 1), enday = id_to_date(sbreakers2),
+        .assign(age = sends2 - sstarts2, enday = id_to_date(sbreakers2),
             ended = sbreakers2.notna(), original = False)
-    second_resistances = second_resistances.assign(age = rdays2.sum(axis = 1), enday = id_to_date(rbreakers2),
+    second_resistances = second_resistances.assign(age = rends2 - rstarts2, enday = id_to_date(rbreakers2),
         ended = rbreakers2.notna(), original = False)
 
-    #Start preparing the final data
-    sup = sup.append(second_supports).sort_values("date")
-    sdays = sdays.append(sdays2).sort_index()
-    res = res.append(second_resistances).sort_values("date")
-    rdays = rdays.append(rdays2).sort_index()
-
+    #Start preparing the final data, the alive ranges follow the rows of each frame
+    sup = concat([sup, second_supports])
+    sstarts, sends = concatenate([sstarts, sstarts2]), concatenate([sends, sends2])
+    sdays = _days_frame(sup.index, sstarts, sends, data.index)
+    sorder = sup["date"].to_numpy().argsort(kind = "stable")
+    sup, sstarts, sends = sup.iloc[sorder], sstarts[sorder], sends[sorder]
+    res = concat([res, second_resistances])
+    rstarts, rends = concatenate([rstarts, rstarts2]), concatenate([rends, rends2])
+    rdays = _days_frame(res.index, rstarts, rends, data.index)
+    rorder = res["date"].to_numpy().argsort(kind = "stable")
+    res, rstarts, rends = res.iloc[rorder], rstarts[rorder], rends[rorder]
 
     #Finally compute days that the supports/resistances almost got breached but
-    # survived
-    sclose = close_days(sup, data, sdays, thresh=thresh, reference_col="low",
-        compare_col= "close", date_col="date", resistances=False)
-    rclose = close_days(res, data, rdays, thresh=thresh, reference_col="high",
-        compare_col="close", date_col="date", resistances=True)
-    
+    # survived, only the days each support was alive need to be checked
+    sclose = DataFrame(_close_in_ranges(_prices(sup, "low"), close, sstarts,
+        sends, thresh), index = sup.index, columns = data.index)
+    rclose = DataFrame(_close_in_ranges(_prices(res, "high"), close, rstarts,
+        rends, thresh), index = res.index, columns = data.index)
+
     sup = sup.assign(close = sclose.sum(axis = 1))
     res = res.assign(close = rclose.sum(axis = 1))
 
     sclose.columns = id_to_date(sclose.columns)
     rclose.columns = id_to_date(rclose.columns)
 
-    return (sup.sort_values("date"), sdays, sclose, res.sort_values("date"), rdays, rclose)
+    return (sup, sdays, sclose, res, rdays, rclose)
 
 
 def get_supports(data, reference_col: str = "low", compare_col: str = "close",
-                date_col: str = "date", thresh: int = 0.01, resistances: bool = False) -> DataFrame:
+                date_col: str = "date", thresh: int = 0.01, resistances: bool = False,
+                engine: str = None) -> DataFrame:
     """Get all support days in data with the number of days that each support lasted
 
     Parameters
@@ -248,6 +357,9 @@ def get_supports(data, reference_col: str = "low", compare_col: str = "close",
         broken, by default 0.01
     resistances : bool, optional
         Calculate resistances instead
+    engine : str, optional
+        Engine used to find the support days, None (default) for vectorized
+        comparisons or "cython"/"numba" to use pandas rolling windows
 
     Returns
     -------
@@ -257,47 +369,33 @@ def get_supports(data, reference_col: str = "low", compare_col: str = "close",
         day but with a new "age" column specifying for how many days the support
         survived before breaking.
         A boolean DataFrame that indicates which supports where close to a previous one.
+        With the polars backend both are polars objects and the second one is a
+        boolean numpy matrix aligned with the rows of the first one.
     """
+    if get_backend() == "polars":
+        from . import _polars_backend
+        return _polars_backend.get_supports(data, reference_col, compare_col, date_col,
+            thresh, resistances)
     data = data.sort_values(date_col)
     #Get all the days that are supports (lower than the two adjacent days in value_col)
-    sups = _get_days(data, value_col=reference_col, resistances=resistances)
-    val_vec = (-1)**resistances*sups[reference_col].to_numpy()
-    refer_vec = (-1)**resistances*data[compare_col].to_numpy()
-    difs = subtract.outer(val_vec, refer_vec) / abs(val_vec[:, None])
-    #Get matrix with which days before an after the supports
-    difdates = subtract.outer(sups[date_col].astype("int").to_numpy(),
-        data[date_col].astype("int").to_numpy())
-    predates = difdates >= 0
-    postdates = invert(predates)
-    #Get matrix with which days have a higher value_col than each support
-    # days the support survives
-    days_higher = difs < thresh
-    days_surviving = logical_or(predates, days_higher).cumprod(axis=1)
-    days_surviving = logical_and(postdates, days_surviving)
-    #Finally get the days in which supports almost got broken but survived
-    difs = DataFrame(difs, columns= data.index) \
-        .loc[:, sups.index] \
-        .to_numpy()
-    difdates = DataFrame(difdates, columns= data.index) \
-        .loc[:, sups.index] \
-        .to_numpy()
-    days_alive = DataFrame(days_surviving, columns= data.index) \
-        .loc[:, sups.index] \
-        .to_numpy()
-    days_close = abs(difs) < thresh
-    days_close = logical_and(days_close, days_alive)
-    ret = sups \
-        .assign(
-            age = Series(days_surviving.sum(axis=1), index = sups.index),
-            near = Series(days_close.sum(axis=1), index = sups.index)) \
-        .sort_values("date")
+    is_sup = _days_mask(data, value_col=reference_col, resistances=resistances, engine=engine)
+    sups = data[is_sup]
+    ref_vec = _prices(sups, reference_col)
+    comp_vec = _prices(data, compare_col)
+    age, near, end_idx = _scan_supports(ref_vec, comp_vec,
+        _int_dates(sups, date_col), _int_dates(data, date_col),
+        is_sup, thresh, resistances)
+    days_close = _close_supports(ref_vec, comp_vec, flatnonzero(is_sup), age, near,
+        end_idx, thresh)
+    #sups keeps the date order of data, no need to sort again
+    ret = sups.assign(age = age, near = near)
     ret = ret.assign(
         end = ret["date"] + to_timedelta(ret["age"], unit = "D")
     )
     return ret, DataFrame(days_close, index = ret.index, columns = ret.index)
 
 def get_resistances(data, reference_col: str = "high", compare_col: str = "close",
-                    date_col: str = "date", thresh: int = 0.01) -> DataFrame:
+                    date_col: str = "date", thresh: int = 0.01, engine: str = None) -> DataFrame:
     """Get all resitance days in data with the number of days until each resistance
     was broken
 
@@ -316,6 +414,8 @@ def get_resistances(data, reference_col: str = "high", compare_col: str = "close
     thresh : int, optional
         How much (in proportion) can a resistance be surpased until its considered
         broken, by default 0.01
+    engine : str, optional
+        Engine used to find the resistance days, see get_supports
 
     Returns
     -------
@@ -324,21 +424,53 @@ def get_resistances(data, reference_col: str = "high", compare_col: str = "close
         day but with a new "age" column specifying for how many days the resistance
         survived before breaking.
     """
-    return get_supports(data, reference_col, compare_col, date_col, thresh, resistances= True)
+    return get_supports(data, reference_col, compare_col, date_col, thresh, resistances= True,
+        engine= engine)
 
 
 # ---------------------------------------
 
-def get_closest_support(x: Series, info: DataFrame, comp: DataFrame, close: DataFrame) -> dict:
-    candidates = info[comp[x.name]]
-    if candidates.empty:
-        return {"sup_val": 0, "sup_vol": -1, "sup_age": 0, "sup_close": 0}
-    else:
-        id_ = ((candidates["low"] - x["close"])/x["close"]).abs().idxmin()
-        age = comp.loc[id_, :x.name].shape[0]
-        ncl = close.loc[id_, :x["date"]].sum()
-        return {"sup_val": info.loc[id_, "low"], "sup_vol": info.loc[id_, "volume"],
-            "sup_age": age, "sup_close": ncl}
+def _positions(index, labels):
+    """Positions of labels in index, raising KeyError (as .loc would) for the labels
+    that are not there instead of returning -1 for them
+    """
+    pos = index.get_indexer(labels)
+    if (pos < 0).any():
+        raise KeyError("{} not in index".format(list(labels[pos < 0][:5])))
+    return pos
+
+def _closest_supports(data: DataFrame, info: DataFrame, comp: DataFrame, close: DataFrame,
+    value_col: str) -> tuple:
+    """For each day in data find the support in info that was alive that day with
+    the price closest to the day close price
+
+    Returns the position in info of that support for every day (-1 if no support
+    was alive), the position of each day in comp's columns plus one (0 if no
+    support was alive) and the close days the support had accumulated until that
+    day
+    """
+    cols = _positions(comp.columns, data.index)
+    alive = comp.to_numpy()[_positions(comp.index, info.index)][:, cols]
+    prices = data["close"].to_numpy("float64")
+    dist = abs((info[value_col].to_numpy("float64")[:, None] - prices)/prices)
+    dist[~alive | isnan(dist)] = inf
+    found = alive.any(axis = 0)
+    best = where(found, dist.argmin(axis = 0) if len(info) else 0, -1)
+    #Close days accumulated until each date (columns are dates), only for the
+    # supports that were the closest one some day
+    rows, inverse = unique(_positions(close.index, info.index)[best[found]],
+        return_inverse = True)
+    ncl_mat = close.to_numpy()[rows].cumsum(axis = 1, dtype = "int32")
+    pos = close.columns.searchsorted(data["date"].to_numpy()[found], side = "right")
+    ncl = zeros(len(data))
+    ncl[found] = where(pos > 0, ncl_mat[inverse, maximum(pos - 1, 0)], 0)
+    return best, where(found, cols + 1, 0), ncl
+
+def _pick(values, best, default):
+    out = array(broadcast_to(default, best.shape), dtype = "float64")
+    found = best >= 0
+    out[found] = values[best[found]]
+    return out
 
 def add_supports(data: DataFrame, info: DataFrame, comp: DataFrame, close: DataFrame) -> DataFrame:
     """Add columns regarding the closest supports to each day in a dataFrame with
@@ -369,23 +501,14 @@ def add_supports(data: DataFrame, info: DataFrame, comp: DataFrame, close: DataF
             the relevant day (days that the support was almost breached but ultimately
             the price bounced back)
     """
-    new_cols = data \
-        .apply(get_closest_support, axis = 1, info = info, comp = comp, close = close) \
-        .apply(Series)
-    return concat([data, new_cols], axis = 1)
+    best, age, ncl = _closest_supports(data, info, comp, close, "low")
+    return data.assign(
+        sup_val = _pick(info["low"].to_numpy("float64"), best, 0),
+        sup_vol = _pick(info["volume"].to_numpy("float64"), best, -1),
+        sup_age = age.astype("float64"),
+        sup_close = ncl)
 
 
-def get_closest_resitances(x: Series, info: DataFrame, comp: DataFrame, close: DataFrame) -> dict:
-    candidates = info[comp[x.name]]
-    if candidates.empty:
-        return {"res_val": 2*x["close"], "res_vol": -1, "res_age": 0, "res_close": 0}
-    else:
-        id_ = ((candidates["high"] - x["close"])/x["close"]).abs().idxmin()
-        age = comp.loc[id_, :x.name].shape[0]
-        ncl = close.loc[id_, :x["date"]].sum()
-        return {"res_val": info.loc[id_, "high"], "res_vol": info.loc[id_, "volume"],
-            "res_age": age, "res_close": ncl}
-
 def add_resistances(data: DataFrame, info: DataFrame, comp: DataFrame, close: DataFrame) -> DataFrame:
     """Add columns regarding the closest resistances to each day in a dataFrame with
     historical data about a stock
@@ -415,11 +538,22 @@ def add_resistances(data: DataFrame, info: DataFrame, comp: DataFrame, close: Da
             the relevant day (days that the resistance was almost breached but ultimately
             the price bounced back)
     """
-    new_cols = data \
-        .apply(get_closest_resitances, axis = 1, info = info, comp = comp, close = close) \
-        .apply(Series)
-    return concat([data, new_cols], axis = 1)
-
+    best, age, ncl = _closest_supports(data, info, comp, close, "high")
+    return data.assign(
+        res_val = _pick(info["high"].to_numpy("float64"), best,
+            2*data["close"].to_numpy("float64")),
+        res_vol = _pick(info["volume"].to_numpy("float64"), best, -1),
+        res_age = age.astype("float64"),
+        res_close = ncl)
+
+
+#The artifacts of a symbol take tens of MB, keep only the last few symbols
+@lru_cache(maxsize = 8)
+def _load_artifacts(paths: tuple, stamps: tuple) -> tuple:
+    """Read the pickled artifacts of a symbol once, stamps (the modification times
+    of the files) only take part in the cache key so rewritten files are read again
+    """
+    return tuple(read_pickle(p) for p in paths)
 
 def process_supports_resistances(data: DataFrame, artifacts_dir: str,
     thresh: float = 0.01) -> DataFrame:
@@ -429,8 +563,8 @@ def process_supports_resistances(data: DataFrame, artifacts_dir: str,
     artidir = pathlib.Path(artifacts_dir) / symb
     needed = [artidir / n for n in needed]
     if all(f.is_file() for f in needed):
-        supinfo, supdays, supclose, resinfo, resdays, resclose = tuple(
-            read_pickle(p) for p in needed)
+        supinfo, supdays, supclose, resinfo, resdays, resclose = _load_artifacts(
+            tuple(needed), tuple(f.stat().st_mtime_ns for f in needed))
     else:
         elements = get_supports_resistances(
             data = data, thresh=thresh, date_col = "date"
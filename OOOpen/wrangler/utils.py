@@ -1,10 +1,71 @@
-from pandas import DataFrame, to_datetime, concat
+from pandas import DataFrame, to_datetime, concat, factorize
+from numpy import argsort, searchsorted, arange, diff
 
 def id_to_date(ids):
     return to_datetime(ids.str.slice(start = -8), format = "%Y%m%d")
 
-def apply_to_multiple_symbols(data: DataFrame, function, **kwargs):
-    return data.groupby("symbol").apply(function, **kwargs).droplevel("symbol")
+def _symbol_groups(data: DataFrame) -> list:
+    """Split data into a DataFrame per symbol (sorted by symbol, rows in their
+    original order) slicing the rows by position instead of going through groupby
+    """
+    codes, symbols = factorize(data["symbol"])
+    #Codes follow the order of appearance, so grouped data (the usual layout) has
+    # them non decreasing and is sliced as is, otherwise it is reordered once
+    if not (len(codes) and codes[0] >= 0 and (diff(codes) >= 0).all()):
+        #A stable sort of int16 keys is a radix sort
+        order = argsort(codes.astype("int16") if len(symbols) < 2**15 else codes,
+            kind = "stable")
+        codes = codes[order]
+        data = data.take(order)
+    bounds = searchsorted(codes, arange(len(symbols) + 1))
+    return [data.iloc[bounds[k]:bounds[k + 1]] for k in argsort(symbols, kind = "stable")]
+
+def apply_to_multiple_symbols(data: DataFrame, function, n_jobs: int = 1,
+    engine: str = "joblib", **kwargs):
+    """Apply function to the data of each symbol and put the results back together
+
+    Parameters
+    ----------
+    data : DataFrame
+        The data of several symbols, with a "symbol" column
+    function : callable
+        Function that takes the DataFrame of a single symbol, any extra keyword
+        argument is passed to it
+    n_jobs : int, optional
+        Number of symbols to process at the same time (-1 to use all the cores),
+        by default 1 (no parallelism)
+    engine : str, optional
+        Library that runs the symbols in parallel when n_jobs != 1, "joblib" or
+        "dask", by default "joblib". Both run the symbols in separate processes
+        (the numba kernels can't be launched from several threads at once with
+        every threading layer), so function and its results must be picklable
+
+    Raises
+    ------
+    ValueError
+        If engine is not "joblib" or "dask"
+
+    Returns
+    -------
+    DataFrame
+        The concatenated results for every symbol
+    """
+    if engine not in ("joblib", "dask"):
+        raise ValueError("Unknown engine {}, use 'joblib' or 'dask'".format(engine))
+    groups = _symbol_groups(data)
+    if not groups:
+        return data.iloc[:0]
+    if n_jobs == 1:
+        results = [function(group, **kwargs) for group in groups]
+    elif engine == "joblib":
+        from joblib import Parallel, delayed
+        results = Parallel(n_jobs=n_jobs)(
+            delayed(function)(group, **kwargs) for group in groups)
+    else:
+        import dask
+        results = dask.compute(*(dask.delayed(function)(group, **kwargs) for group in groups),
+            scheduler="processes", num_workers=n_jobs if n_jobs > 0 else None)
+    return concat(results)
 
 def shift_data(data: DataFrame, previous: int) -> DataFrame:
     cols = ["open", "high", "low", "close", "volume"]